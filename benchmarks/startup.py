@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+
+# ------------------------------------------------
+# built-ins
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+# ------------------------------------------------
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+SAMPLE = './sample_data/postgap.20180108.100.txt.gz'
+
+
+def time_command(args, repeats):
+    """
+    Return the median wall time in seconds of running args from the
+    repository root.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the startup time of runner.py, and the time per file '
+                    'when checking many small files in one process.')
+    parser.add_argument('filename', nargs='?', default=SAMPLE,
+                        help='small file in POSTGAP TSV format to check (default: {})'.format(SAMPLE))
+    parser.add_argument('-r', '--repeats', type=int, default=5,
+                        help='runs per measurement, of which the median is reported (default: 5)')
+    parser.add_argument('-n', '--files', type=int, default=20,
+                        help='number of times to check filename in one process (default: 20)')
+    args = parser.parse_args()
+
+    python = sys.executable
+    interpreter = time_command([python, '-c', 'pass'], args.repeats)
+    help_ = time_command([python, 'runner.py', '--help'], args.repeats)
+    one_file = time_command([python, 'runner.py', args.filename], args.repeats)
+    many_files = time_command([python, 'runner.py'] + [args.filename] * args.files, args.repeats)
+    per_file = (many_files - one_file) / (args.files - 1) if args.files > 1 else one_file
+
+    print('interpreter startup         {:8.3f}s'.format(interpreter))
+    print('runner.py --help            {:8.3f}s'.format(help_))
+    print('runner.py, 1 file           {:8.3f}s'.format(one_file))
+    print('runner.py, {:3d} files        {:8.3f}s'.format(args.files, many_files))
+    print('  per additional file       {:8.3f}s'.format(per_file))
+    print('  startup share of 1 file   {:8.0%}'.format(1 - per_file / one_file))
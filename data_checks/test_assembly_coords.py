@@ -0,0 +1,59 @@
+# ------------------------------------------------
+# built-ins
+import unittest
+
+# local
+from utils.base import TestPostgapBase
+from utils.liftover import load_chain_index, normalise_chroms
+# ------------------------------------------------
+
+class TestPostgapAssemblyCoords(TestPostgapBase):
+    '''
+    GRCh37 coordinates lifted over with a local UCSC chain file (runner
+    option `--chain-file`) should give the reported GRCh38 coordinates.
+    Positions that do not lift over are not checked.
+    '''
+
+    columns = ['ld_snp_rsID', 'chrom', 'pos', 'GRCh38_chrom', 'GRCh38_pos',
+               'gene_id', 'gene_chrom', 'gene_tss', 'GRCh38_gene_chrom', 'GRCh38_gene_pos']
+
+    def setUp(self):
+        chain_file = self.options.get('chain_file')
+        if chain_file is None:
+            self.skipTest('NO LIFTOVER CHAIN FILE GIVEN')
+        self.chain_index = load_chain_index(chain_file)
+
+    def assert_coords_match_liftover(self, id_field, chrom_field, pos_field,
+                                     GRCh38_chrom_field, GRCh38_pos_field):
+        fields = [id_field, chrom_field, pos_field, GRCh38_chrom_field, GRCh38_pos_field]
+        coords = self.pg[fields].drop_duplicates().reset_index(drop=True)
+        lifted_chroms, lifted_positions = self.chain_index.lift(coords[chrom_field].values,
+                                                                coords[pos_field].values)
+        coords['lifted_chrom'] = lifted_chroms
+        coords['lifted_pos'] = lifted_positions
+
+        mapped = coords.lifted_chrom.notnull()
+        chroms = normalise_chroms(coords[chrom_field].values)
+        GRCh38_chroms = normalise_chroms(coords[GRCh38_chrom_field].values)
+        chrom_changed = mapped & (coords.lifted_chrom != chroms)
+        disagree = mapped & ((coords.lifted_chrom != GRCh38_chroms) |
+                             (coords.lifted_pos != coords[GRCh38_pos_field]))
+        offenders = coords[chrom_changed | disagree]
+        self.export_violations(offenders)
+        self.assertTrue(offenders.empty,
+                        '{} of {} lifted coordinates disagree with {}/{} '
+                        '({} change chromosome)\n{}'.format(
+                            len(offenders), mapped.sum(), GRCh38_chrom_field, GRCh38_pos_field,
+                            chrom_changed.sum(), offenders.to_string(index=False)))
+
+    def test_pos_lifts_to_GRCh38_pos(self):
+        self.assert_coords_match_liftover('ld_snp_rsID', 'chrom', 'pos',
+                                          'GRCh38_chrom', 'GRCh38_pos')
+
+    def test_gene_tss_lifts_to_GRCh38_gene_pos(self):
+        self.assert_coords_match_liftover('gene_id', 'gene_chrom', 'gene_tss',
+                                          'GRCh38_gene_chrom', 'GRCh38_gene_pos')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,7 @@
 import unittest
 
 # local
-from tests.utils.base import TestPostgapBase
+from utils.base import TestPostgapBase
 
 # ------------------------------------------------
 
@@ -39,6 +39,8 @@ EXPECTED_ASSIGNMENTS = {
 
 
 class TestPostgapGoldStandards(TestPostgapBase):
+    columns = []
+
     def test_each_expected_association_is_present(self):
         self.skipTest('CHECK ALL GOLD STANDARD EXPECTED ASSOCIATIONS')
 
@@ -8,6 +8,8 @@ from utils.base import TestPostgapBase
 
 class TestGWASCatalogCoverage(TestPostgapBase):
 
+    columns = []
+
     def test_each_gwas_efo_covered(self):
         self.skipTest('EACH GWAS EFO ID COVERED IN POSTGAP OUTPUT')
 
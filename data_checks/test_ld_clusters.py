@@ -0,0 +1,59 @@
+# ------------------------------------------------
+# built-ins
+import unittest
+
+# pipped
+import numpy as np
+import pandas as pd
+
+# local
+from utils.base import TestPostgapBase
+from utils.graph import encode_nodes, connected_components
+# ------------------------------------------------
+
+class TestPostgapLdClusters(TestPostgapBase):
+    '''
+    A cluster is a connected component of the graph with an edge between
+    each LD SNP and GWAS SNP in a row. Clusters are per disease, so nodes are
+    (disease_efo_id, rsID) pairs. As with groupby, rows with a null
+    disease_efo_id, ld_snp_rsID or gwas_snp are not considered.
+    '''
+
+    columns = ['disease_efo_id', 'ld_snp_rsID', 'gwas_snp', 'cluster_id']
+
+    def setUp(self):
+        pg = self.pg.dropna(subset=['disease_efo_id', 'ld_snp_rsID', 'gwas_snp'])
+        n = len(pg)
+        diseases = pg.disease_efo_id.values
+        snps = np.concatenate([pg.ld_snp_rsID.values, pg.gwas_snp.values])
+        nodes, n_nodes = encode_nodes(np.concatenate([diseases, diseases]), snps)
+        roots = connected_components(nodes[:n], nodes[n:], n_nodes)
+        self.clusters = pd.DataFrame({
+            'cluster_id': pg.cluster_id.values,
+            'component': roots[nodes[:n]],
+            'disease_efo_id': diseases,
+            'ld_snp_rsID': pg.ld_snp_rsID.values
+        }).drop_duplicates(['cluster_id', 'component'])
+
+    def test_each_cluster_id_is_one_ld_component(self):
+        components = self.clusters.groupby('cluster_id').component.nunique()
+        split = components[components > 1].rename('components').reset_index()
+        self.export_violations(split)
+        self.assertTrue(split.empty,
+                        '{} cluster_ids split across LD components\n{}'.format(
+                            len(split), split.to_string(index=False)))
+
+    def test_each_ld_component_has_one_cluster_id(self):
+        per_component = self.clusters.groupby('component')
+        cluster_ids = per_component.cluster_id.nunique()
+        merged = per_component.head(1).set_index('component')[['disease_efo_id', 'ld_snp_rsID']]
+        merged['cluster_ids'] = cluster_ids
+        merged = merged[merged.cluster_ids > 1]
+        self.export_violations(merged.reset_index())
+        self.assertTrue(merged.empty,
+                        '{} LD components merging cluster_ids\n{}'.format(
+                            len(merged), merged.to_string(index=False)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,10 +16,13 @@ MHC_END_GRCH37 = 33448354
 MHC_START_GRCH38 = 28510120
 MHC_END_GRCH38 = 33480577
 
-MHC_CHROM = 6
+MHC_CHROM = '6'
 
 class TestPostgapMHCRegion(TestPostgapBase):
 
+    columns = ['chrom', 'pos', 'GRCh38_chrom', 'GRCh38_pos',
+               'gene_chrom', 'gene_tss', 'GRCh38_gene_chrom', 'GRCh38_gene_pos']
+
     def test_canary(self):
         self.assertTrue(True)
 
@@ -0,0 +1,59 @@
+# ------------------------------------------------
+# built-ins
+import unittest
+
+# local
+from utils.base import TestPostgapBase
+from utils.liftover import normalise_chroms
+from utils.tss import TssIndex
+# ------------------------------------------------
+
+class TestPostgapNearestGene(TestPostgapBase):
+    '''
+    `Nearest` should be set for the (ld_snp_rsID, gene_id) pairs where the
+    gene TSS is the nearest TSS to the LD SNP (GRCh37).
+
+    TSSs come from a local gene annotation file (runner option
+    `--gene-annotation`) or else from the unique genes of the file itself.
+    The genes of the file are a subset of all genes, so only the annotation
+    can show that the nearest gene of an LD SNP was not flagged.
+    '''
+
+    columns = ['ld_snp_rsID', 'chrom', 'pos', 'gene_id', 'gene_chrom', 'gene_tss', 'Nearest']
+
+    def setUp(self):
+        annotation = self.options.get('gene_annotation')
+        if annotation is None:
+            self.tss_index = TssIndex.from_frame(self.pg)
+        else:
+            self.tss_index = TssIndex.from_file(annotation)
+
+        pairs = self.pg[self.columns].drop_duplicates(['ld_snp_rsID', 'gene_id']).reset_index(drop=True)
+        pairs['distance'] = (pairs.pos - pairs.gene_tss).abs()
+        pairs['nearest_distance'] = self.tss_index.nearest_distances(pairs.chrom.values, pairs.pos.values)
+        same_chrom = (normalise_chroms(pairs.chrom.values) == normalise_chroms(pairs.gene_chrom.values))
+        pairs['is_nearest'] = same_chrom & (pairs.distance == pairs.nearest_distance)
+        self.pairs = pairs
+
+    def test_Nearest_set_only_for_nearest_gene(self):
+        offenders = self.pairs[(self.pairs.Nearest == 1) & ~self.pairs.is_nearest]
+        self.export_violations(offenders)
+        self.assertTrue(offenders.empty,
+                        '{} (ld_snp_rsID, gene_id) pairs with Nearest set for a gene '
+                        'that is not the nearest\n{}'.format(
+                            len(offenders), offenders.to_string(index=False)))
+
+    def test_Nearest_set_for_nearest_gene(self):
+        if self.options.get('gene_annotation') is None:
+            self.skipTest('NO GENE ANNOTATION FILE GIVEN')
+        nearest = self.pairs[self.pairs.is_nearest]
+        flagged = (nearest.Nearest == 1).groupby(nearest.ld_snp_rsID).any()
+        offenders = flagged[~flagged].reset_index().ld_snp_rsID
+        self.export_violations(offenders.to_frame())
+        self.assertTrue(offenders.empty,
+                        '{} LD SNPs with their nearest gene present but without Nearest set\n{}'.format(
+                            len(offenders), offenders.to_string(index=False)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,17 +2,70 @@
 # built-ins
 import unittest
 
+# pipped
+import numpy as np
+
 # local
 from utils.base import TestPostgapBase
+from utils.sorting import lexsort_fields, run_starts
 # ------------------------------------------------
 
+# GWAS associations are filtered at this p-value by POSTGAP
+GWAS_PVALUE_CUTOFF = 1e-4
+
 class TestPValueFiltering(TestPostgapBase):
+    '''
+    Within each (gwas_pmid, disease_efo_id) set, each GWAS SNP should have a
+    single p-value and the largest p-value of the set should pass the cutoff.
+
+    Rows are sorted once by (gwas_pmid, disease_efo_id, gwas_snp, gwas_pvalue),
+    so that each set, and each GWAS SNP within it, is a run of adjacent rows.
+    Both checks then work on the run boundaries.
+    '''
+
+    columns = ['gwas_pmid', 'disease_efo_id', 'gwas_snp', 'gwas_pvalue']
+
+    def setUp(self):
+        pg = self.pg[self.columns].dropna(subset=['gwas_pvalue'])
+        order, (pmids, efos, snps, pvalues) = lexsort_fields(pg, self.columns)
+        self.sorted = pg.iloc[order]
+        self.pvalues = pvalues
+        self.set_starts = run_starts([pmids, efos])
+        self.snp_starts = run_starts([pmids, efos, snps])
+        self.pvalue_starts = run_starts([pmids, efos, snps, pvalues])
+
+    def runs(self, starts, fields):
+        '''
+        Return the first row of each run as a `pandas.DataFrame` of fields,
+        with the number of rows per run, and the positions of the run starts.
+        '''
+        idx = np.flatnonzero(starts)
+        runs = self.sorted.iloc[idx][fields].reset_index(drop=True)
+        runs['rows'] = np.diff(np.append(idx, len(starts)))
+        return runs, idx
 
     def test_one_pvalue_per_gwas_pmid_and_efo_id(self):
-        self.skipTest('ONE PVALUE PER GWAS PMID AND EFO ID')
+        if len(self.sorted) == 0:
+            return
+        runs, idx = self.runs(self.snp_starts, ['gwas_pmid', 'disease_efo_id', 'gwas_snp'])
+        runs['pvalues'] = np.add.reduceat(self.pvalue_starts.astype(int), idx)
+        offenders = runs[runs.pvalues > 1]
+        self.export_violations(offenders)
+        self.assertTrue(offenders.empty,
+                        '{} GWAS SNPs with more than one p-value per study/trait\n{}'.format(
+                            len(offenders), offenders.to_string(index=False)))
 
     def test_largest_pvalue_of_set_per_gwas_pmid_AND_efo_id(self):
-        self.skipTest('LARGEST PVALUE OF SET PER GWAS PMID AND EFO ID')
+        if len(self.sorted) == 0:
+            return
+        runs, idx = self.runs(self.set_starts, ['gwas_pmid', 'disease_efo_id'])
+        runs['largest_pvalue'] = np.maximum.reduceat(self.pvalues, idx)
+        runs['rows_above_cutoff'] = np.add.reduceat((self.pvalues > GWAS_PVALUE_CUTOFF).astype(int), idx)
+        offenders = runs[runs.largest_pvalue > GWAS_PVALUE_CUTOFF]
+        self.export_violations(offenders)
+        self.assertTrue(offenders.empty,
+                        '{} study/traits with largest p-value above {}\n{}'.format(
+                            len(offenders), GWAS_PVALUE_CUTOFF, offenders.to_string(index=False)))
 
 
 if __name__ == '__main__':
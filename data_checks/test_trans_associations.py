@@ -12,6 +12,10 @@ class TestTransAssociations(TestPostgapBase):
     being consistent within groups is tested elsewhere.
     '''
 
+    columns = ['gene_id', 'ld_snp_rsID', 'gene_symbol', 'chrom', 'gene_chrom',
+               'GRCh38_chrom', 'GRCh38_gene_chrom']
+    backends = ('pandas', 'sqlite')
+
     def setUp(self):
         self.per_gene_and_ld_snp = self.pg.groupby(['gene_id', 'ld_snp_rsID'])
 
@@ -22,7 +26,10 @@ class TestTransAssociations(TestPostgapBase):
         first_exception = None
         if (not all_chroms_match):
             fields = ['ld_snp_rsID', 'gene_id', 'gene_symbol', chrom_field, gene_chrom_field]
-            first_exception = firsts[~chroms_match][fields].head(1).to_string(index=False)
+            violations = firsts[~chroms_match][fields].rename_axis('row').reset_index()
+            first_exception = '{} ({} of {} (gene_id, ld_snp_rsID) pairs)'.format(
+                violations[fields].head(1).to_string(index=False), len(violations), len(firsts))
+            self.export_violations(violations)
         self.assertTrue(all_chroms_match, first_exception)
 
     def test_trans_associations_filtered(self):
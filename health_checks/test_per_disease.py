@@ -8,6 +8,10 @@ from utils.base import TestPostgapBase
 
 class TestPostgapPerDisease(TestPostgapBase):
 
+    columns = ['disease_efo_id', 'disease_name']
+    backends = ('pandas', 'sqlite')
+    release_mergeable = True
+
     def setUp(self):
         self.per_disease = self.pg.groupby('disease_efo_id')
 
@@ -8,6 +8,11 @@ from utils.base import TestPostgapBase
 
 class TestPostgapPerGene(TestPostgapBase):
 
+    columns = ['gene_id', 'gene_symbol', 'gene_chrom', 'gene_tss',
+               'GRCh38_gene_chrom', 'GRCh38_gene_pos']
+    backends = ('pandas', 'sqlite')
+    release_mergeable = True
+
     def setUp(self):
         self.per_gene = self.pg.groupby('gene_id')
 
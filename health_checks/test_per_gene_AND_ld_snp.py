@@ -8,6 +8,10 @@ from utils.base import TestPostgapBase
 
 class TestPostgapPerGeneANDLdSnp(TestPostgapBase):
 
+    columns = ['gene_id', 'ld_snp_rsID', 'VEP', 'GTEx', 'PCHiC', 'DHS',
+               'Fantom5', 'Nearest', 'Regulome', 'score']
+    backends = ('pandas', 'sqlite')
+
     def setUp(self):
         self.per_gene_and_ld_snp = self.pg.groupby(['gene_id', 'ld_snp_rsID'])
 
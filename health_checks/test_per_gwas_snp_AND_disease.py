@@ -8,6 +8,9 @@ from utils.base import TestPostgapBase
 
 class TestPostgapPerGwasSnpANDDisease(TestPostgapBase):
 
+    columns = ['gwas_snp', 'disease_efo_id']
+    backends = ('pandas', 'sqlite')
+
     def setUp(self):
         self.per_gwas_snp_and_disease = self.pg.groupby(['gwas_snp', 'disease_efo_id'])
 
@@ -8,6 +8,10 @@ from utils.base import TestPostgapBase
 
 class TestPostgapPerLdSnp(TestPostgapBase):
 
+    columns = ['ld_snp_rsID', 'chrom', 'pos', 'GRCh38_chrom', 'GRCh38_pos']
+    backends = ('pandas', 'sqlite')
+    release_mergeable = True
+
     def setUp(self):
         self.per_ld_snp = self.pg.groupby('ld_snp_rsID')
 
@@ -8,6 +8,9 @@ from utils.base import TestPostgapBase
 
 class TestPostgapPerLdSnpANDGwasSnp(TestPostgapBase):
 
+    columns = ['ld_snp_rsID', 'gwas_snp', 'r2']
+    backends = ('pandas', 'sqlite')
+
     def setUp(self):
         self.per_ld_snp_and_gwas_snp = self.pg.groupby(['ld_snp_rsID', 'gwas_snp'])
 
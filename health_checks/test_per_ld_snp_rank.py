@@ -0,0 +1,51 @@
+# ------------------------------------------------
+# built-ins
+import unittest
+
+# pipped
+import numpy as np
+
+# local
+from utils.base import TestPostgapBase
+from utils.sorting import lexsort_fields, run_starts, segment_dense_ranks
+# ------------------------------------------------
+
+class TestPostgapPerLdSnpRank(TestPostgapBase):
+    '''
+    The genes of an LD SNP are ranked by ascending score, with tied scores
+    sharing a rank. Ranks may have gaps (genes filtered after ranking), so
+    dense ranks of score and of rank are compared.
+
+    Rows are sorted once by (ld_snp_rsID, score, rank); dense ranks are then
+    cumulative sums over the run boundaries within each LD SNP.
+    '''
+
+    columns = ['ld_snp_rsID', 'gene_id', 'score', 'rank']
+
+    def test_each_ld_snp_rsID_has_rank_consistent_with_score(self):
+        pg = self.pg[self.columns].dropna(subset=['score', 'rank'])
+        if len(pg) == 0:
+            return
+        order, (snps, scores, ranks) = lexsort_fields(pg, ['ld_snp_rsID', 'score', 'rank'])
+        group_starts = run_starts([snps])
+        score_ranks = segment_dense_ranks(run_starts([snps, scores]), group_starts)
+        rank_ranks = segment_dense_ranks(run_starts([snps, ranks]), group_starts)
+
+        # rank must not decrease as score increases within an LD SNP
+        decreasing = np.zeros(len(ranks), dtype=bool)
+        decreasing[1:] = (ranks[1:] < ranks[:-1]) & ~group_starts[1:]
+        mismatch = (score_ranks != rank_ranks) | decreasing
+
+        group_idx = np.flatnonzero(group_starts)
+        groups = pg.iloc[order[group_idx]][['ld_snp_rsID']].reset_index(drop=True)
+        groups['rows'] = np.diff(np.append(group_idx, len(group_starts)))
+        groups['mismatched_rows'] = np.add.reduceat(mismatch.astype(int), group_idx)
+        offenders = groups[groups.mismatched_rows > 0]
+        self.export_violations(offenders)
+        self.assertTrue(offenders.empty,
+                        '{} LD SNPs with rank inconsistent with score\n{}'.format(
+                            len(offenders), offenders.to_string(index=False)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,13 @@ from utils.base import TestPostgapBase
 
 class TestPostgapRow(TestPostgapBase):
 
+    columns = ['ld_snp_rsID', 'chrom', 'pos', 'GRCh38_chrom', 'GRCh38_pos',
+               'afr_maf', 'amr_maf', 'eas_maf', 'eur_maf', 'sas_maf',
+               'gene_id', 'gene_chrom', 'gene_tss',
+               'GRCh38_gene_chrom', 'GRCh38_gene_pos',
+               'disease_efo_id', 'score', 'rank', 'r2', 'gwas_source', 'gwas_snp', 'gwas_pvalue',
+               'GTEx', 'Fantom5', 'DHS', 'PCHiC', 'Nearest']
+
     def test_canary(self):
         self.assertTrue(True)
 
@@ -85,11 +92,11 @@ class TestPostgapRow(TestPostgapBase):
 
     # score
     def test_col_format_score(self):
-        self.skipTest('DEFINE FORMAT FOR score')
+        self.assert_series_in_range(self.pg.score, 0.0, float('inf'))
 
     # rank
     def test_col_format_rank(self):
-        self.skipTest('DEFINE FORMAT FOR rank')
+        self.assert_series_in_range(self.pg['rank'], 1, float('inf'))
 
     # r2
     def test_col_format_r2(self):
@@ -172,7 +179,7 @@ class TestPostgapRow(TestPostgapBase):
 
     # Nearest
     def test_col_format_Nearest(self):
-        self.skipTest('DEFINE FORMAT FOR Nearest')
+        self.assert_series_in_range(self.pg.Nearest, 0.0, 1.0)
 
     # Regulome
     def test_col_format_Regulome(self):
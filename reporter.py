@@ -1,19 +1,210 @@
 # ------------------------------------------------
 # built-ins
+import os
+import re
 import sys
+import argparse
 import datetime
+import tempfile
+import concurrent.futures
 
 # pipped
-import papermill as pm
+import nbformat
+
+# local
+from reports import helpers, memo
 # ------------------------------------------------
 
+TEMPLATE = './reports/template.ipynb'
+SETUP_SECTION = 'Setup'
+SECTION_HEADING = '## '
+HELPER_CALL = re.compile(r'helpers\.(\w+)\(')
+
+
+def split_sections(nb):
+    """
+    Split the cells of a notebook into a preamble and sections, each section
+    starting at a level 2 markdown heading. Returns the preamble cells and
+    an ordered list of (name, cells) for the sections.
+    """
+    preamble = []
+    sections = []
+    for cell in nb.cells:
+        if cell.cell_type == 'markdown' and cell.source.startswith(SECTION_HEADING):
+            name = cell.source.splitlines()[0][len(SECTION_HEADING):].strip()
+            sections.append((name, [cell]))
+        elif sections:
+            sections[-1][1].append(cell)
+        else:
+            preamble.append(cell)
+    return preamble, sections
+
+
+def section_dependencies(sections):
+    """
+    Build the dependency graph of sections. A section depends on the
+    sections listed in the `depends_on` metadata of its heading cell, or
+    else on the setup section, which loads the data.
+    """
+    deps = {}
+    for (name, cells) in sections:
+        default = [] if name == SETUP_SECTION else [SETUP_SECTION]
+        deps[name] = list(cells[0].metadata.get('depends_on', default))
+    return deps
+
+
+def dependency_closure(name, deps):
+    """
+    Return the sections name depends on, directly or not, dependencies first.
+    """
+    closure = []
+    for dep in deps[name]:
+        for d in dependency_closure(dep, deps) + [dep]:
+            if d not in closure:
+                closure.append(d)
+    return closure
+
+
+def section_columns(sections, name, deps):
+    """
+    Return the columns read by the helpers called in a section (and the
+    sections it depends on), or `None` to load all the columns read by
+    helpers, as the setup section does to fill the cache for the others.
+    """
+    if name == SETUP_SECTION:
+        return None
+    cells_by_name = dict(sections)
+    columns = set()
+    for section in dependency_closure(name, deps) + [name]:
+        for cell in cells_by_name[section]:
+            if cell.cell_type == 'code':
+                for f in HELPER_CALL.findall(cell.source):
+                    columns.update(getattr(getattr(helpers, f, None), 'columns', []))
+    return sorted(columns) or None
+
+
+def section_notebook(nb, preamble, sections, name, deps):
+    """
+    Build a notebook computing a single section: the parameters cell, the
+    code cells of the sections it depends on, then the section's cells.
+    The setup section keeps the whole preamble.
+    """
+    cells_by_name = dict(sections)
+    if name == SETUP_SECTION:
+        cells = list(preamble)
+    else:
+        cells = [c for c in preamble if 'parameters' in c.metadata.get('tags', [])]
+    for dep in dependency_closure(name, deps):
+        cells.extend(c for c in cells_by_name[dep] if c.cell_type == 'code')
+    cells.extend(cells_by_name[name])
+    return nbformat.v4.new_notebook(cells=cells, metadata=nb.metadata)
+
+
+def execute_notebook(input_path, output_path, parameters):
+    """
+    Execute a notebook with papermill (run in a worker process, so the
+    slow papermill import is paid by workers only). Returns the output
+    path and, if a cell raised, the error; papermill then still writes
+    the output notebook, with the traceback.
+    """
+    import papermill as pm
+    from papermill.exceptions import PapermillExecutionError
+    try:
+        pm.execute_notebook(input_path, output_path, parameters=parameters)
+    except PapermillExecutionError as e:
+        return output_path, '{}: {}'.format(e.ename, e.evalue)
+    return output_path, None
+
+
+def render_sections(nb, parameters, jobs, workdir):
+    """
+    Execute each section of nb in its own kernel, running sections whose
+    dependencies are done concurrently in a process pool. Sections share
+    the loaded data through the on-disk cache of `reports.helpers.load_file`,
+    which the setup section fills one column at a time: each other section
+    is passed the columns its helpers read, and loads only those.
+
+    Sections depending on a section that failed are not executed. Returns
+    the sections, the executed (or partially executed) notebooks by
+    section, and the errors of the failed sections by section.
+    """
+    preamble, sections = split_sections(nb)
+    deps = section_dependencies(sections)
+    pending = [name for (name, _) in sections]
+    executed = {}
+    failed = {}
+    futures = {}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or futures:
+            for name in list(pending):
+                unmet = [d for d in deps[name] if d in failed]
+                if unmet:
+                    pending.remove(name)
+                    failed[name] = 'not executed, as {} failed'.format(', '.join(unmet))
+            ready = [name for name in pending if all(d in executed and d not in failed for d in deps[name])]
+            if not ready and not futures and pending:
+                raise ValueError('Unsatisfiable section dependencies: {}'.format(
+                    {name: deps[name] for name in pending}))
+            for name in ready:
+                pending.remove(name)
+                input_path = os.path.join(workdir, '{}.in.ipynb'.format(len(executed) + len(futures)))
+                nbformat.write(section_notebook(nb, preamble, sections, name, deps), input_path)
+                section_parameters = dict(parameters, columns=section_columns(sections, name, deps))
+                future = pool.submit(execute_notebook, input_path,
+                                     input_path.replace('.in.', '.out.'), section_parameters)
+                futures[future] = name
+
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = futures.pop(future)
+                output_path, error = future.result()
+                executed[name] = nbformat.read(output_path, as_version=4)
+                if error is not None:
+                    failed[name] = error
+
+    return sections, executed, failed
+
+
+def assemble_report(sections, executed):
+    """
+    Assemble the executed sections in template order. The setup section's
+    notebook provides the preamble; other sections contribute their own
+    (last) cells only, or their template cells if not executed.
+    """
+    report = executed[SETUP_SECTION]
+    for (name, cells) in sections:
+        if name == SETUP_SECTION:
+            continue
+        if name in executed:
+            report.cells.extend(executed[name].cells[-len(cells):])
+        else:
+            report.cells.extend(cells)
+    return report
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a report for a file in POSTGAP TSV format.')
+    parser.add_argument('filename')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='number of report sections to render concurrently (default: number of CPUs); '
+                             'each holds the columns its section reads in memory')
+    args = parser.parse_args()
+
     now = datetime.datetime.now()
-    filename = sys.argv[1]
+    filename = args.filename
     filestem = filename.split('/')[-1]
     ipynb_filename = '{}.REPORT.{}.ipynb'.format(filestem, now.strftime('%Y%m%d%H%M%S'))
-    pm.execute_notebook(
-        './reports/template.ipynb',
-        './__reports__/{}'.format(ipynb_filename),
-        parameters = dict(filename=filename)
-    )
+
+    template = nbformat.read(TEMPLATE, as_version=4)
+    with tempfile.TemporaryDirectory() as workdir:
+        parameters = dict(filename=filename, digest=memo.file_digest(filename))
+        sections, executed, failed = render_sections(template, parameters, args.jobs, workdir)
+    report_filename = './__reports__/{}'.format(ipynb_filename)
+    nbformat.write(assemble_report(sections, executed), report_filename)
+
+    if failed:
+        for (name, error) in failed.items():
+            print('Section {} failed: {}'.format(name, error), file=sys.stderr)
+        print('Partial report with tracebacks written to {}'.format(report_filename), file=sys.stderr)
+        sys.exit(1)
@@ -2,17 +2,15 @@
 # built-ins
 import os
 import datetime
+import functools
 import itertools
 
 # pipped
 import numpy as np
 import pandas as pd
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.colors import LogNorm
-from IPython.display import display, HTML
 
-matplotlib.style.use('ggplot')
+# local
+from reports import memo
 # ------------------------------------------------
 
 ID_FIELDS = ['gene_id', 'ld_snp_rsID', 'gwas_snp', 'disease_efo_id', 'gwas_pmid']
@@ -29,13 +27,63 @@ XLIMS_ZERO_ONE_FIELDS = ['Regulome', 'PCHiC', 'GTEx', 'Fantom5', 'DHS', 'Nearest
 STANDARD_FIG_SIZE = (15, 5)
 STANDARD_HEAD_NUM = 3
 
-def load_file(filename):
-    return pd.read_csv(filename, sep='\t', na_values=['None'])
+def reads_columns(*columns):
+    '''Declare the columns of the POSTGAP file read by a report helper.'''
+    def decorator(f):
+        f.columns = list(columns)
+        return f
+    return decorator
+
+def report_columns():
+    '''Calculate the union of the columns read by the report helpers.'''
+    columns = set()
+    for f in list(globals().values()):
+        columns.update(getattr(f, 'columns', []))
+    return sorted(columns)
+
+def load_file(filename, columns=None, digest=None):
+    '''
+    Load columns of a POSTGAP file, from the cache if the file is unchanged since last loaded.
+    Columns are cached one by one (on disk only), so that loading some of the cached columns
+    reads only those. Pass the digest of the file, if known, to save rehashing it.
+    '''
+    if digest is None:
+        digest = memo.file_digest(filename)
+    if columns is None:
+        columns = list(pd.read_csv(filename, sep='\t', nrows=0).columns)
+    file_dataset = memo.dataset_key(digest)
+    keys = {c: memo.call_key(file_dataset, load_file, (c,)) for c in columns}
+
+    loaded = {}
+    for c in columns:
+        hit, series = memo.CACHE.get(keys[c], remember=False)
+        if hit:
+            loaded[c] = series
+    missing = [c for c in columns if c not in loaded]
+    if missing:
+        parsed = pd.read_csv(filename, sep='\t', na_values=['None'], usecols=missing)
+        for c in missing:
+            loaded[c] = parsed[c]
+            memo.CACHE.put(keys[c], parsed[c], remember=False)
+
+    pg = pd.DataFrame({c: loaded[c] for c in columns}, columns=columns)
+    memo.register_dataset(pg, memo.dataset_key(digest, columns))
+    return pg
+
+@functools.lru_cache(maxsize=None)
+def pyplot():
+    '''Import pyplot (and set the report style) on first plot, as matplotlib is slow to import.'''
+    import matplotlib
+    import matplotlib.pyplot as plt
+    matplotlib.style.use('ggplot')
+    return plt
 
 def print_df(df, index=False):
+    from IPython.display import display, HTML
     display(HTML(df.to_html(index=index)))
 
 def print_hist(series, title='', xlabel='Value', ylabel='Frequency'):
+    plt = pyplot()
     plt.figure(figsize=STANDARD_FIG_SIZE)
     plt.hist(series, bins=100, log=True)
     plt.title(title)
@@ -44,6 +92,7 @@ def print_hist(series, title='', xlabel='Value', ylabel='Frequency'):
     plt.show()
 
 def print_field_hists(pg, field_list, figsize=STANDARD_FIG_SIZE):
+    plt = pyplot()
     plt.figure(figsize=figsize)
     for (i, c) in enumerate(field_list):
         plt.subplot(len(field_list) // 2 + 1, 2, i + 1)
@@ -54,19 +103,29 @@ def print_field_hists(pg, field_list, figsize=STANDARD_FIG_SIZE):
         plt.ylabel('Frequency')
     plt.show()
 
-def calc_g2v_field_hists(pg):
-    '''Calculate the distributions of G2V subscores (across unique gene-LD SNP pairs)'''
+@memo.memoize
+def per_gene_and_ld_snp(pg):
+    '''Calculate the first row of each unique gene-LD SNP pair (shared by the G2V helpers)'''
     # TODO: pd.DataFrame.first() is preferable to pd.DataFrame.nth(0), but 
     #       see issue https://github.com/pandas-dev/pandas/issues/19283.
     #       Upgrade pandas when they have fixed this.
-    per_g2v = pg.groupby(['gene_id', 'ld_snp_rsID']).nth(0).reset_index()
-    print_field_hists(per_g2v, G2V_FIELDS, figsize=(15, 20))
+    return pg.groupby(['gene_id', 'ld_snp_rsID']).nth(0).reset_index()
 
+@memo.memoize
+def per_gwas_snp_and_disease(pg):
+    '''Calculate the first row of each unique GWAS SNP-disease pair'''
+    # TODO: Check this should be per (gwas_snp, disease). Does gwas_study/gwas_pmid etc matter?
+    return pg.groupby(['gwas_snp', 'disease_efo_id']).nth(0).reset_index()
+
+@reads_columns('gene_id', 'ld_snp_rsID', *G2V_FIELDS)
+def calc_g2v_field_hists(pg):
+    '''Calculate the distributions of G2V subscores (across unique gene-LD SNP pairs)'''
+    print_field_hists(per_gene_and_ld_snp(pg), G2V_FIELDS, figsize=(15, 20))
+
+@reads_columns('gwas_snp', 'disease_efo_id', *V2D_FIELDS)
 def calc_v2d_field_hists(pg):
     '''Calculate the distributions of V2D subscores (across unique GWAS SNP-disease pairs)'''
-    # TODO: Check this should be per (gwas_snp, disease). Does gwas_study/gwas_pmid etc matter?
-    per_v2d = pg.groupby(['gwas_snp', 'disease_efo_id']).nth(0).reset_index()
-    print_field_hists(per_v2d, V2D_FIELDS, figsize=(15, 10))
+    print_field_hists(per_gwas_snp_and_disease(pg), V2D_FIELDS, figsize=(15, 10))
 
 def calc_run_str():
     '''Calculate when and by who the notebook was generated.'''
@@ -74,36 +133,64 @@ def calc_run_str():
     user = os.environ['USER']
     print('Notebook generated at {} by {}'.format(now.isoformat(), user))
 
+def calc_shape(pg, filename):
+    '''Calculate the number of rows and columns of the file (pg may hold only some of its columns).'''
+    header = pd.read_csv(filename, sep='\t', nrows=0)
+    print((pg.shape[0], header.shape[1]))
+
+@memo.memoize
+def id_field_counts(pg):
+    return pd.DataFrame([[c, pg[c].nunique()] for (i, c) in enumerate(ID_FIELDS)],
+                        columns=['field', 'unique_values'])
+
+@reads_columns(*ID_FIELDS)
 def calc_id_field_counts(pg):
     '''Calculate how many unique values occur for each of ID_FIELDS.'''
-    df = pd.DataFrame([[c, pg[c].nunique()] for (i, c) in enumerate(ID_FIELDS)],
-                      columns=['field', 'unique_values'])
-    print_df(df)
+    print_df(id_field_counts(pg))
 
-def calc_id_field_max_rows(pg):
-    '''Calculate the top few max occurrences for each of ID_FIELDS.'''
+@memo.memoize
+def id_field_max_rows(pg):
+    dfs = []
     for (i, c) in enumerate(ID_FIELDS):
         groups = pg.groupby(c)
         group_frequencies = groups.size().sort_values(ascending=False)
-        df = group_frequencies.to_frame(name='row_occurrences').reset_index(c).head(STANDARD_HEAD_NUM)
+        dfs.append(group_frequencies.to_frame(name='row_occurrences').reset_index(c).head(STANDARD_HEAD_NUM))
+    return dfs
+
+@reads_columns(*ID_FIELDS)
+def calc_id_field_max_rows(pg):
+    '''Calculate the top few max occurrences for each of ID_FIELDS.'''
+    for df in id_field_max_rows(pg):
         print_df(df)
 
+@memo.memoize
+def field_pair_counts(pg, field_pairs):
+    return pd.DataFrame([[c, len(pg.groupby(c).size())] for (i, c) in enumerate(field_pairs)],
+                        columns=['field_pair', 'unique_associations'])
+
 def calc_field_pair_counts(pg, field_pairs):
     '''Calculate how many unique values occur for each field pair in field_pairs.'''
-    df = pd.DataFrame([[c, len(pg.groupby(c).size())] for (i, c) in enumerate(field_pairs)],
-                      columns=['field_pair', 'unique_associations'])
-    print_df(df)
+    print_df(field_pair_counts(pg, field_pairs))
 
+@reads_columns('gene_id', 'disease_efo_id')
 def calc_g2d_pair_counts(pg):
     calc_field_pair_counts(pg, [['gene_id', 'disease_efo_id']])
 
+@reads_columns(*itertools.chain(*ID_FIELD_PAIRS))
 def calc_id_field_pair_counts(pg):
     calc_field_pair_counts(pg, ID_FIELD_PAIRS)
 
-def calc_pairwise_degree_dist(pg, field_a, field_b, label_a, label_b):
-    '''Calculate the degree distribution across A nodes to B nodes and vice versa.'''
+@memo.memoize
+def pairwise_degrees(pg, field_a, field_b):
     a_degrees = pg.groupby(field_a)[field_b].nunique()
     b_degrees = pg.groupby(field_b)[field_a].nunique()
+    return a_degrees, b_degrees
+
+@reads_columns(*ID_FIELDS)
+def calc_pairwise_degree_dist(pg, field_a, field_b, label_a, label_b):
+    '''Calculate the degree distribution across A nodes to B nodes and vice versa (A and B in ID_FIELDS).'''
+    plt = pyplot()
+    a_degrees, b_degrees = pairwise_degrees(pg, field_a, field_b)
 
     plt.figure(figsize=STANDARD_FIG_SIZE)
 
@@ -120,15 +207,49 @@ def calc_pairwise_degree_dist(pg, field_a, field_b, label_a, label_b):
     plt.xlabel('Degree')
     plt.show()
 
+@memo.memoize
+def per_ld_snp_and_gwas_snp_r2(pg):
+    return pg.groupby(['ld_snp_rsID', 'gwas_snp'])['r2'].nth(0)
+
+@reads_columns('ld_snp_rsID', 'gwas_snp', 'r2')
 def calc_dist_r2(pg):
     '''Calculate the distribution of r2 (across unique LD SNP-GWAS SNP pairs)'''
-    r2 = pg.groupby(['ld_snp_rsID', 'gwas_snp'])['r2'].nth(0)
-    print_hist(r2, title='LD (r2) Distribution')
+    print_hist(per_ld_snp_and_gwas_snp_r2(pg), title='LD (r2) Distribution')
+
+@memo.memoize
+def snp_gene_dists(pg):
+    pairs = per_gene_and_ld_snp(pg)
+    pairs = pairs[pairs.chrom.astype(str) == pairs.gene_chrom.astype(str)]
+    dist = (pairs.pos - pairs.gene_tss).abs()
+    return dist, dist[pairs.Nearest == 1]
+
+@reads_columns('gene_id', 'ld_snp_rsID', 'chrom', 'pos', 'gene_chrom', 'gene_tss', 'Nearest')
+def calc_dist_snp_gene(pg):
+    '''Calculate the distribution of LD SNP-gene TSS distance (across unique gene-LD SNP pairs on the same chromosome)'''
+    plt = pyplot()
+    dist, nearest_dist = snp_gene_dists(pg)
+
+    plt.figure(figsize=STANDARD_FIG_SIZE)
 
+    plt.subplot(121)
+    plt.hist(dist, bins=100, log=True)
+    plt.title('LD SNP-Gene TSS Distance Distribution')
+    plt.ylabel('Frequency')
+    plt.xlabel('Distance (bp)')
+
+    plt.subplot(122)
+    plt.hist(nearest_dist, bins=100, log=True)
+    plt.title('LD SNP-Nearest Gene TSS Distance Distribution')
+    plt.ylabel('Frequency')
+    plt.xlabel('Distance (bp)')
+    plt.show()
+
+@reads_columns('gene_id', 'ld_snp_rsID', *G2V_FIELDS)
 def calc_g2v_field_cross_dists(pg):
     '''Calculate pairwise distributions (as heatmap) of G2V fields.'''
-    PAIR = ['gene_id', 'ld_snp_rsID']
-    subscore_fields = pg[[*PAIR, *G2V_FIELDS]].groupby(PAIR).nth(0)
+    from matplotlib.colors import LogNorm
+    plt = pyplot()
+    subscore_fields = per_gene_and_ld_snp(pg)
     combs = itertools.combinations(G2V_FIELDS, 2)
 
     plt.figure(figsize=(15, 15))
@@ -151,8 +272,12 @@ def calc_g2v_field_cross_dists(pg):
     plt.tight_layout()
     plt.show()
 
+@memo.memoize
+def g2v_field_venn(pg):
+    subscores = per_gene_and_ld_snp(pg)[G2V_FIELDS]
+    return subscores.apply(lambda x: str([c for c in x.index if x[c] > 0]), axis=1).value_counts()
+
+@reads_columns('gene_id', 'ld_snp_rsID', *G2V_FIELDS)
 def calc_g2v_field_overlap(pg):
     '''Calculate the venn diagram of G2V fields.'''
-    per_gene_and_ld_snp = pg.groupby(['gene_id', 'ld_snp_rsID']).nth(0)[G2V_FIELDS]
-    g2v_field_venn = per_gene_and_ld_snp.apply(lambda x: str([c for c in x.index if x[c] > 0]), axis=1).value_counts()
-    print(g2v_field_venn)
+    print(g2v_field_venn(pg))
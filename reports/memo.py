@@ -0,0 +1,248 @@
+# ------------------------------------------------
+# built-ins
+import os
+import sys
+import types
+import pickle
+import hashlib
+import inspect
+import weakref
+import functools
+import collections
+
+# pipped
+import numpy as np
+import pandas as pd
+# ------------------------------------------------
+
+CACHE_DIR = os.environ.get(
+    'POSTGAP_REPORT_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, '__cache__')
+)
+MEMORY_CACHE_BYTES = 1024 ** 3
+DISK_CACHE_BYTES = 2 * 1024 ** 3
+HASH_BLOCK_BYTES = 1024 ** 2
+
+# id(pg) -> (weak reference to pg, dataset key), for frames from `load_file`
+_DATASETS = {}
+
+
+def file_digest(filename):
+    '''Calculate the SHA-1 hex digest of a file's contents.'''
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def dataset_key(digest, columns=None):
+    '''
+    Calculate the key of the dataset loaded from columns (or all columns)
+    of the file with SHA-1 digest. The pandas version is part of the key,
+    as pickles may not load across versions.
+    '''
+    return '{}:{}:{}'.format(digest, repr(columns), pd.__version__)
+
+
+def register_dataset(pg, key):
+    '''Record the dataset key of a loaded `pandas.DataFrame`, saving a rehash of its contents.'''
+    for (pg_id, (ref, _)) in list(_DATASETS.items()):
+        if ref() is None:
+            del _DATASETS[pg_id]
+    _DATASETS[id(pg)] = (weakref.ref(pg), key)
+
+
+def frame_key(pg):
+    '''Return the dataset key of pg, hashing its contents if it was not registered.'''
+    ref, key = _DATASETS.get(id(pg), (None, None))
+    if ref is not None and ref() is pg:
+        return key
+    hashes = pd.util.hash_pandas_object(pg, index=True).values
+    return 'frame:{}:{}:{}'.format(hashlib.sha1(hashes.tobytes()).hexdigest(), list(pg.columns), pd.__version__)
+
+
+def hash_code(code, sha1):
+    '''Update sha1 with the bytecode, constants and names of a code object.'''
+    sha1.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            hash_code(const, sha1)
+        elif isinstance(const, frozenset):
+            sha1.update(repr(sorted(const, key=repr)).encode('utf-8'))
+        else:
+            sha1.update(repr(const).encode('utf-8'))
+    sha1.update(repr(code.co_names).encode('utf-8'))
+
+
+def code_names(code):
+    '''Yield the global names used by a code object and the code nested in it.'''
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from code_names(const)
+
+
+@functools.lru_cache(maxsize=None)
+def code_digest(f):
+    '''
+    Calculate the SHA-1 hex digest of the code of f and of the functions of
+    its module it calls (directly or not), so that editing a helper changes
+    the keys of the results cached for it.
+    '''
+    sha1 = hashlib.sha1()
+    seen = set()
+    pending = [f]
+    while pending:
+        g = inspect.unwrap(pending.pop())
+        if g in seen:
+            continue
+        seen.add(g)
+        hash_code(g.__code__, sha1)
+        for name in code_names(g.__code__):
+            callee = g.__globals__.get(name)
+            if isinstance(callee, types.FunctionType) and callee.__module__ == g.__module__:
+                pending.append(callee)
+    return sha1.hexdigest()
+
+
+def call_key(dataset, f, args):
+    '''Calculate the cache key for a call of f (with its code) with args on a dataset.'''
+    call = '{}|{}.{}|{}|{}'.format(dataset, f.__module__, f.__name__, code_digest(f), repr(args))
+    return hashlib.sha1(call.encode('utf-8')).hexdigest()
+
+
+def value_bytes(value):
+    '''Estimate the memory used by a cached value.'''
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(value_bytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_bytes(k) + value_bytes(v) for (k, v) in value.items())
+    return sys.getsizeof(value)
+
+
+class LRUCache(object):
+    '''
+    Two-level least recently used cache: values in memory bounded in total
+    (estimated) size, backed by pickle files in a directory bounded in
+    total size.
+    '''
+
+    def __init__(self, directory, max_memory_bytes=MEMORY_CACHE_BYTES, max_bytes=DISK_CACHE_BYTES):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_bytes = max_bytes
+        self.memory = collections.OrderedDict()
+        self.memory_bytes = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, '{}.pickle'.format(key))
+
+    def get(self, key, remember=True):
+        '''
+        Return (True, value) if key is cached, else (False, None). A value
+        read from disk is kept in memory if remember.
+        '''
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return True, self.memory[key][0]
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception:
+            # eg. truncated, or pickled by versions of libraries or helpers
+            # that no longer load: recompute and replace it
+            self.remove(path)
+            return False, None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process (eg. a concurrent report section)
+            pass
+        if remember:
+            self.remember(key, value)
+        return True, value
+
+    def put(self, key, value, remember=True):
+        '''Cache value on disk, and in memory if remember.'''
+        size = value_bytes(value)
+        if remember:
+            self.remember(key, value, size)
+        if size > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if os.path.getsize(tmp_path) > self.max_bytes:
+            self.remove(tmp_path)
+            return
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def remember(self, key, value, size=None):
+        '''Keep value in memory, unless it is larger than max_memory_bytes.'''
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        size = value_bytes(value) if size is None else size
+        if size > self.max_memory_bytes:
+            return
+        self.memory[key] = (value, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory_bytes:
+            self.memory_bytes -= self.memory.popitem(last=False)[1][1]
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        '''Delete the least recently used files until the directory fits in max_bytes.'''
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pickle'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+
+CACHE = LRUCache(CACHE_DIR)
+
+
+def memoize(f):
+    '''
+    Cache the result of f(pg, *args) in memory and on disk, keyed by the
+    dataset pg was loaded from, f (and its code) and args. Results are
+    shared between calls, so must not be modified.
+    '''
+    @functools.wraps(f)
+    def wrapper(pg, *args):
+        key = call_key(frame_key(pg), f, args)
+        hit, value = CACHE.get(key)
+        if not hit:
+            value = f(pg, *args)
+            CACHE.put(key, value)
+        return value
+    return wrapper
@@ -2,40 +2,233 @@
 
 # ------------------------------------------------
 # built-ins
+import argparse
+import os
 import sys
+import tempfile
 import unittest
 
-# pipped
-import pandas as pd
-import papermill as pm
+# local
+from utils.base import TestPostgapBase, postgap_dtypes
 # ------------------------------------------------
 
-def add_postgap(suite, postgap):
+# packages of checks to discover; others (eg. reports) are not imported
+CHECK_PACKAGES = ['data_checks', 'health_checks']
+
+def add_postgap(suite, postgap, options=None):
     """
     Iterate through suite and construct a new suite where
-    each test has postgap passed as a keyword arg to it's
-    constructor.
+    each test has postgap (and options) passed as a keyword
+    arg to it's constructor.
     """
     new_suite = unittest.TestSuite()
 
     for item in suite:
         test_class = item.__class__
         if test_class == unittest.TestSuite:
-            new_suite.addTest(add_postgap(item, postgap))
+            new_suite.addTest(add_postgap(item, postgap, options))
+        elif issubclass(test_class, TestPostgapBase):
+            test_name = item._testMethodName
+            new_suite.addTest(test_class(test_name, postgap, options))
+        else:
+            new_suite.addTest(item)
+
+    return new_suite
+
+
+def filter_backend(suite, backend):
+    """
+    Iterate through suite and construct a new suite without
+    the postgap tests that do not support backend.
+    """
+    new_suite = unittest.TestSuite()
+
+    for item in suite:
+        test_class = item.__class__
+        if test_class == unittest.TestSuite:
+            new_suite.addTest(filter_backend(item, backend))
+        elif not issubclass(test_class, TestPostgapBase) or backend in test_class.backends:
+            new_suite.addTest(item)
+
+    return new_suite
+
+
+def filter_release_mergeable(suite):
+    """
+    Iterate through suite and construct a new suite with
+    only the postgap tests that can run across a release.
+    """
+    new_suite = unittest.TestSuite()
+
+    for item in suite:
+        test_class = item.__class__
+        if test_class == unittest.TestSuite:
+            new_suite.addTest(filter_release_mergeable(item))
+        elif issubclass(test_class, TestPostgapBase) and test_class.release_mergeable:
+            new_suite.addTest(item)
+
+    return new_suite
+
+
+def add_fingerprints(suite, fingerprints, options=None):
+    """
+    Iterate through suite and construct a new suite where
+    each test has the release fingerprint of its columns
+    passed as postgap to it's constructor.
+    """
+    new_suite = unittest.TestSuite()
+
+    for item in suite:
+        test_class = item.__class__
+        if test_class == unittest.TestSuite:
+            new_suite.addTest(add_fingerprints(item, fingerprints, options))
         else:
             test_name = item._testMethodName
-            new_suite.addTest(test_class(test_name, postgap))
+            postgap = fingerprints[tuple(test_class.columns)]
+            new_suite.addTest(test_class(test_name, postgap, options))
 
     return new_suite
 
 
+def iter_test_classes(suite):
+    """
+    Iterate through suite and yield the class of each test.
+    """
+    for item in suite:
+        if isinstance(item, unittest.TestSuite):
+            yield from iter_test_classes(item)
+        else:
+            yield item.__class__
+
+
+def required_columns(suite):
+    """
+    Return the union of the columns declared by the postgap tests in
+    suite, or `None` if any of them needs all columns.
+    """
+    columns = set()
+    for test_class in iter_test_classes(suite):
+        if not issubclass(test_class, TestPostgapBase):
+            continue
+        if test_class.columns is None:
+            return None
+        columns.update(test_class.columns)
+    return sorted(columns)
+
+
+def load_postgap(filename, columns=None):
+    """
+    Load a file in POSTGAP TSV format, parsing only columns if given.
+    """
+    import pandas as pd
+    return pd.read_csv(filename, sep='\t', na_values=['None'], usecols=columns,
+                       dtype=postgap_dtypes(columns))
+
+
+def discover_checks(loader):
+    """
+    Discover the tests of the check packages only.
+    """
+    suite = unittest.TestSuite()
+    for package in CHECK_PACKAGES:
+        suite.addTest(loader.discover(package, top_level_dir='.'))
+    return suite
+
+
+def check_file(suite, filename, backend, options, database=None):
+    """
+    Run suite against a file in POSTGAP TSV format with backend, ingesting
+    it into database (or a temporary file) for the sqlite backend.
+    """
+    runner = unittest.TextTestRunner(verbosity=2)
+    if backend != 'sqlite':
+        postgap = load_postgap(filename, required_columns(suite))
+        return runner.run(add_postgap(suite, postgap, options))
+
+    from utils.database import PostgapDatabase
+    database_filename = database
+    if database_filename is None:
+        (fd, database_filename) = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+    postgap = None
+    try:
+        postgap = PostgapDatabase.from_tsv(filename, database_filename, required_columns(suite))
+        return runner.run(add_postgap(suite, postgap, options))
+    finally:
+        # also on ingest errors or interrupts, as the file is as large as the input
+        if postgap is not None:
+            postgap.close()
+        if database is None and os.path.exists(database_filename):
+            os.remove(database_filename)
+
+
+def check_release(suite, filenames, options):
+    """
+    Run the release mergeable tests of suite against the merged
+    fingerprints of the files of a release.
+    """
+    from utils.release import fingerprint_release
+    suite = filter_release_mergeable(suite)
+    column_sets = sorted(set(tuple(c.columns) for c in iter_test_classes(suite)))
+    fingerprints = fingerprint_release(filenames, column_sets, load_postgap)
+    options = dict(options, release=True)
+    return unittest.TextTestRunner(verbosity=2).run(add_fingerprints(suite, fingerprints, options))
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run checks against files in POSTGAP TSV format.')
+    parser.add_argument('filenames', nargs='+', metavar='filename',
+                        help='files to check one after the other in this process')
+    parser.add_argument('-t', '--tests', nargs='+', metavar='NAME',
+                        help='dotted names of test modules, classes or methods to run '
+                             '(eg. data_checks.test_mhc_region); default is to discover all')
+    parser.add_argument('--chain-file',
+                        help='local UCSC GRCh37 to GRCh38 liftover chain file (eg. hg19ToHg38.over.chain.gz) '
+                             'to check assembly coordinates against')
+    parser.add_argument('--gene-annotation',
+                        help='local gene annotation TSV file (columns gene_id, chrom, tss; GRCh37) '
+                             'to check nearest genes against; default is the genes of the file')
+    parser.add_argument('--backend', choices=['pandas', 'sqlite'], default='pandas',
+                        help='run checks on a pandas.DataFrame in memory, or on an embedded '
+                             'SQLite database file for files larger than memory '
+                             '(group-level checks only)')
+    parser.add_argument('--database',
+                        help='SQLite database file to ingest into for --backend sqlite '
+                             '(overwritten); default is a temporary file')
+    parser.add_argument('--release', action='store_true',
+                        help='filenames are release directories: check that identifiers are consistent '
+                             'across their files (postgap.*.txt.gz), one file in memory at a time '
+                             '(pandas backend only)')
+    parser.add_argument('--violations-dir',
+                        help='directory to write every violation of each failing check to, '
+                             'as <test id>.npz (read with utils.violations.read_violations)')
+    args = parser.parse_args()
+
     loader = unittest.TestLoader()
-    suite = loader.discover('.')
-    
-    filename = sys.argv[1]
-    postgap = pd.read_csv(filename, sep='\t', na_values=['None'])
-
-    suite_with_postgap = add_postgap(suite, postgap)
-    result = unittest.TextTestRunner(verbosity=2).run(suite_with_postgap)
-    sys.exit(not result.wasSuccessful())
+    if args.tests:
+        suite = loader.loadTestsFromNames(args.tests)
+    else:
+        suite = discover_checks(loader)
+    suite = filter_backend(suite, args.backend)
+    options = dict(chain_file=args.chain_file, gene_annotation=args.gene_annotation,
+                   violations_dir=args.violations_dir)
+
+    if args.release:
+        if args.backend != 'pandas':
+            parser.error('--release supports the pandas backend only')
+        from utils.release import release_files
+        filenames = [f for directory in args.filenames for f in release_files(directory)]
+        if not filenames:
+            parser.error('no release files (postgap.*.txt.gz) in {}'.format(', '.join(args.filenames)))
+        sys.exit(not check_release(suite, filenames, options).wasSuccessful())
+
+    successful = True
+    for filename in args.filenames:
+        file_options = dict(options)
+        if len(args.filenames) > 1:
+            print('Checking {}'.format(filename), file=sys.stderr)
+            if args.violations_dir is not None:
+                file_options['violations_dir'] = os.path.join(args.violations_dir, os.path.basename(filename))
+        result = check_file(suite, filename, args.backend, file_options, args.database)
+        successful = successful and result.wasSuccessful()
+    sys.exit(not successful)
@@ -1,5 +1,6 @@
 # ------------------------------------------------
 # built-ins
+import os
 import unittest
 # ------------------------------------------------
 
@@ -9,15 +10,93 @@ VALID_SNP_ID_REGEX = '^rs\d+$'
 VALID_GENE_ID_REGEX = '^ENSG\d+$'
 VALID_EFO_ID_REGEX = '^EFO_\d+$'
 
+# Chromosomes are numbers in most rows but also X, Y or patch contigs
+# (eg. CHR_HSCHR5_3_CTG1), so are always read as strings. Otherwise the
+# type would depend on the rows (or chunks of rows) pandas reads first.
+POSTGAP_DTYPES = {
+    'chrom': str,
+    'GRCh38_chrom': str,
+    'gene_chrom': str,
+    'GRCh38_gene_chrom': str
+}
+
+
+def postgap_dtypes(columns=None):
+    '''Return the dtypes of `POSTGAP_DTYPES` for columns (or all columns).'''
+    return {field: dtype for (field, dtype) in POSTGAP_DTYPES.items()
+            if columns is None or field in columns}
+
 
 class TestPostgapBase(unittest.TestCase):
     """
     Base class for postgap tests. Provides common utility methods.
+
+    Subclasses declare the `columns` of the POSTGAP file their tests read,
+    so that the runner only parses those. `None` means all columns.
+
+    `options` holds the runner's optional settings (eg. `chain_file`). If
+    it has a `violations_dir`, assertions also write every violation there.
+
+    Subclasses whose tests only use `groupby` uniqueness (and first rows)
+    also list `sqlite` in `backends`; postgap is then a
+    `utils.database.PostgapDatabase` rather than a `pandas.DataFrame`.
+
+    Subclasses whose tests only check that `columns` are consistent per
+    identifier set `release_mergeable`, so they also run across a release
+    directory on the merged distinct rows of `columns` of its files, with
+    the first `file` of each (the runner then sets the `release` option).
     """
 
-    def __init__(self, test_name, postgap=None):
+    columns = None
+    backends = ('pandas',)
+    release_mergeable = False
+
+    def __init__(self, test_name, postgap=None, options=None):
         super(TestPostgapBase, self).__init__(test_name)
         self.pg = postgap
+        self.options = options or {}
+
+    def export_violations(self, violations):
+        """
+        Write violations (a `pandas.DataFrame`, with the `row` offset of each
+        violating row if known) to `<violations_dir>/<test id>.npz`, if the
+        runner was given a violations directory and there are violations.
+        """
+        directory = self.options.get('violations_dir')
+        if directory is None or len(violations) == 0:
+            return
+        from utils.violations import write_violations
+        os.makedirs(directory, exist_ok=True)
+        write_violations(os.path.join(directory, '{}.npz'.format(self.id())), violations)
+
+    def export_series_violations(self, violations):
+        """
+        Export the violating values of a `pandas.Series` with their row offsets.
+        """
+        if self.options.get('violations_dir') is not None:
+            self.export_violations(violations.rename_axis('row').reset_index())
+
+    def export_groupby_violations(self, groupbyseries, counts):
+        """
+        Export all rows of the groups of a `pandas.SeriesGroupBy` whose unique
+        value counts are not one, with their row offsets, or in a release
+        with the file of each row instead.
+        """
+        if self.options.get('violations_dir') is None:
+            return
+        if hasattr(groupbyseries, 'non_unique_rows'):
+            self.export_violations(groupbyseries.non_unique_rows())
+            return
+        keys = groupbyseries.keys
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        if self.options.get('release'):
+            rows = self.pg[keys + [groupbyseries.obj.name, 'file']]
+            in_groups = rows.set_index(keys).index.isin(counts.index)
+            self.export_violations(rows[in_groups].reset_index(drop=True))
+            return
+        rows = self.pg[keys + [groupbyseries.obj.name]]
+        in_groups = rows.set_index(keys).index.isin(counts.index)
+        self.export_violations(rows[in_groups].rename_axis('row').reset_index())
 
     def assert_series_against_interval(self, series, low, high, inside=True):
         """
@@ -35,13 +114,17 @@ class TestPostgapBase(unittest.TestCase):
 
             all_meet_criteria = meet_criteria.all()
             if (not all_meet_criteria):
-                first_exception = series[~meet_criteria].head(1).to_string(index=False)
-                first_exception = '{}{} in [{}, {}]'.format(
+                violations = series[~meet_criteria]
+                first_exception = violations.head(1).to_string(index=False)
+                first_exception = '{}{} in [{}, {}] ({} of {} values)'.format(
                     first_exception,
                     ' not' if inside else '',
                     low,
-                    high
+                    high,
+                    len(violations),
+                    len(series)
                 )
+                self.export_series_violations(violations)
 
         self.assertTrue(all_meet_criteria, first_exception)
 
@@ -69,8 +152,13 @@ class TestPostgapBase(unittest.TestCase):
         """
         match = series.str.match(regex)
         all_match = match.all()
-        self.assertTrue(all_match,
-                        series[~match].head(1).to_string(index=False))
+        first_exception = None
+        if (not all_match):
+            violations = series[~match]
+            first_exception = '{} ({} of {} values do not match {})'.format(
+                violations.head(1).to_string(index=False), len(violations), len(series), regex)
+            self.export_series_violations(violations)
+        self.assertTrue(all_match, first_exception)
 
     def assert_series_valid_gene_id(self, series):
         """
@@ -94,8 +182,15 @@ class TestPostgapBase(unittest.TestCase):
         """
         Check if all values in a `pandas.Series` are valid chromosomal coords.
         """
-        self.assertTrue((series > 0).all(),
-                        series[series <= 0].head(1))
+        valid = (series > 0)
+        all_valid = valid.all()
+        first_exception = None
+        if (not all_valid):
+            violations = series[~valid]
+            first_exception = '{} ({} of {} values not positive)'.format(
+                violations.head(1).to_string(index=False), len(violations), len(series))
+            self.export_series_violations(violations)
+        self.assertTrue(all_valid, first_exception)
 
     def assert_series_valid_chrom(self, series):
         """
@@ -104,7 +199,10 @@ class TestPostgapBase(unittest.TestCase):
         series_str = series.apply(str)
         chrs = series_str.unique()
         all_valid = all(chr in VALID_CHROMOSOMES for chr in chrs)
-        invalid_freqs = series_str[~series_str.isin(VALID_CHROMOSOMES)].value_counts()
+        invalid = ~series_str.isin(VALID_CHROMOSOMES)
+        invalid_freqs = series_str[invalid].value_counts()
+        if (not all_valid):
+            self.export_series_violations(series[invalid])
         self.assertTrue(all_valid, invalid_freqs)
 
     def assert_series_valid_gwas_source(self, series):
@@ -113,7 +211,10 @@ class TestPostgapBase(unittest.TestCase):
         """
         sources = series.unique()
         all_valid = all(s in VALID_GWAS_SOURCES for s in sources)
-        invalid_freqs = series[~series.isin(VALID_GWAS_SOURCES)].value_counts()
+        invalid = ~series.isin(VALID_GWAS_SOURCES)
+        invalid_freqs = series[invalid].value_counts()
+        if (not all_valid):
+            self.export_series_violations(series[invalid])
         self.assertTrue(all_valid, invalid_freqs)
 
 
@@ -127,5 +228,11 @@ class TestPostgapBase(unittest.TestCase):
         """
         counts = groupbyseries.nunique()
         counts_are_one = (counts == 1)
-        self.assertTrue(counts_are_one.all(),
-                        counts[~counts_are_one].head(1))
+        all_counts_are_one = counts_are_one.all()
+        first_exception = None
+        if (not all_counts_are_one):
+            violations = counts[~counts_are_one]
+            first_exception = '{} of {} groups without a unique value, eg.\n{}'.format(
+                len(violations), len(counts), violations.head(1))
+            self.export_groupby_violations(groupbyseries, violations)
+        self.assertTrue(all_counts_are_one, first_exception)
@@ -0,0 +1,170 @@
+# ------------------------------------------------
+# built-ins
+import os
+import sqlite3
+
+# pipped
+import pandas as pd
+
+# local
+from utils.base import postgap_dtypes
+# ------------------------------------------------
+
+TABLE = 'postgap'
+INGEST_CHUNKSIZE = 500000
+
+
+def quote(field):
+    return '"{}"'.format(field)
+
+
+class PostgapDatabase(object):
+    """
+    A POSTGAP file ingested into an embedded SQLite database file.
+
+    Offers the subset of the `pandas.DataFrame` groupby interface used by
+    the group-level checks, answered by aggregate queries. SQLite sorts
+    groups in temporary files, so files larger than memory can be checked.
+    """
+
+    def __init__(self, filename, dtypes=None):
+        self.filename = filename
+        self.dtypes = dtypes or {}
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('PRAGMA temp_store = FILE')
+
+    @classmethod
+    def from_tsv(cls, tsv_filename, filename, columns=None, chunksize=INGEST_CHUNKSIZE):
+        """
+        Ingest a file in POSTGAP TSV format (only columns if given) into a new
+        database file, one chunk at a time.
+
+        Columns of `utils.base.POSTGAP_DTYPES` are read with those types, as
+        by the pandas backend. A first pass finds the type each other column
+        would have if the whole file was read at once, so that every chunk
+        is stored with the same types.
+        """
+        def read_chunks(dtype):
+            return pd.read_csv(tsv_filename, sep='\t', na_values=['None'],
+                               usecols=columns, chunksize=chunksize, dtype=dtype)
+
+        dtypes = {}
+        for chunk in read_chunks(postgap_dtypes(columns)):
+            for (field, dtype) in chunk.dtypes.items():
+                if field not in dtypes:
+                    dtypes[field] = dtype
+                elif not pd.api.types.is_numeric_dtype(dtype):
+                    dtypes[field] = object
+                elif pd.api.types.is_numeric_dtype(dtypes[field]):
+                    dtypes[field] = (dtypes[field] if dtype == dtypes[field] else float)
+        read_dtypes = {field: dtype for (field, dtype) in dtypes.items()
+                       if not pd.api.types.is_numeric_dtype(dtype) or dtype == float}
+        read_dtypes.update(postgap_dtypes(columns))
+
+        if os.path.exists(filename):
+            os.remove(filename)
+        db = cls(filename, dtypes)
+        try:
+            for chunk in read_chunks(read_dtypes):
+                chunk.to_sql(TABLE, db.connection, if_exists='append', index=False)
+            db.connection.commit()
+        except BaseException:
+            db.close()
+            raise
+        return db
+
+    def close(self):
+        self.connection.close()
+
+    def query(self, sql):
+        return pd.read_sql_query(sql, self.connection)
+
+    def typed(self, frame):
+        """
+        Cast the numeric columns of a query result back to their ingest
+        types, as SQLite returns a column of nulls as objects.
+        """
+        for field in frame.columns:
+            dtype = self.dtypes.get(field)
+            if dtype is not None and pd.api.types.is_numeric_dtype(dtype):
+                frame[field] = frame[field].astype(dtype)
+        return frame
+
+    def groupby(self, by):
+        return DatabaseGroupBy(self, by)
+
+
+class DatabaseGroupBy(object):
+    """
+    Rows of a `PostgapDatabase` grouped by one or more fields. As with
+    `pandas`, rows with a null key are excluded and groups are sorted.
+    """
+
+    def __init__(self, db, by):
+        self.db = db
+        self.keys = [by] if isinstance(by, str) else list(by)
+
+    def __getattr__(self, field):
+        if field.startswith('_'):
+            raise AttributeError(field)
+        return DatabaseSeriesGroupBy(self, field)
+
+    def __getitem__(self, field):
+        return DatabaseSeriesGroupBy(self, field)
+
+    def key_list(self):
+        return ', '.join(quote(k) for k in self.keys)
+
+    def where_keys_not_null(self):
+        return ' AND '.join('{} IS NOT NULL'.format(quote(k)) for k in self.keys)
+
+    def head(self, n=1):
+        """
+        Return the first row of each group, indexed by its 0-based row offset
+        as with `pandas`. Only `n=1` is supported.
+        """
+        if n != 1:
+            raise NotImplementedError('only the first row of each group is supported')
+        return self.db.typed(self.db.query(
+            'SELECT rowid - 1 AS row, * FROM {table} WHERE rowid IN ('
+            'SELECT MIN(rowid) FROM {table} WHERE {not_null} GROUP BY {keys}'
+            ') ORDER BY rowid'.format(
+                table=TABLE, not_null=self.where_keys_not_null(), keys=self.key_list()))).set_index('row')
+
+
+class DatabaseSeriesGroupBy(object):
+    """
+    A field of a `DatabaseGroupBy`.
+    """
+
+    def __init__(self, groupby, field):
+        self.groupby = groupby
+        self.field = field
+
+    def nunique(self):
+        """
+        Return the number of distinct non-null values per group, as a
+        `pandas.Series` indexed by the group keys.
+        """
+        g = self.groupby
+        counts = g.db.query(
+            'SELECT {keys}, COUNT(DISTINCT {field}) AS {field} FROM {table} '
+            'WHERE {not_null} GROUP BY {keys} ORDER BY {keys}'.format(
+                keys=g.key_list(), field=quote(self.field), table=TABLE,
+                not_null=g.where_keys_not_null()))
+        return counts.set_index(g.keys)[self.field]
+
+    def non_unique_rows(self):
+        """
+        Return the rows of the groups without exactly one distinct value,
+        as a `pandas.DataFrame` of their 0-based `row` offset, keys and field.
+        """
+        g = self.groupby
+        return g.db.typed(g.db.query(
+            'SELECT {table}.rowid - 1 AS row, {columns} FROM {table} JOIN ('
+            'SELECT {keys} FROM {table} WHERE {not_null} GROUP BY {keys} '
+            'HAVING COUNT(DISTINCT {field}) != 1'
+            ') AS groups USING ({keys}) ORDER BY {table}.rowid'.format(
+                table=TABLE, keys=g.key_list(), field=quote(self.field),
+                not_null=g.where_keys_not_null(),
+                columns=', '.join('{}.{}'.format(TABLE, quote(f)) for f in g.keys + [self.field]))))
@@ -0,0 +1,46 @@
+# ------------------------------------------------
+# pipped
+import numpy as np
+import pandas as pd
+# ------------------------------------------------
+
+def encode_nodes(*node_arrays):
+    """
+    Integer-encode nodes given as parallel arrays of labels (eg. disease and
+    rsID). Returns a code in [0, n) for each node and the number of nodes n.
+    Labels must not be null, as nulls would share codes with other nodes.
+    """
+    codes = np.zeros(len(node_arrays[0]), dtype=np.int64)
+    for labels in node_arrays:
+        label_codes, uniques = pd.factorize(labels)
+        if (label_codes < 0).any():
+            raise ValueError('cannot encode null node labels')
+        codes = codes * len(uniques) + label_codes
+    codes, uniques = pd.factorize(codes)
+    return codes, len(uniques)
+
+
+def connected_components(a, b, n):
+    """
+    Find the connected components of the undirected graph on nodes [0, n)
+    with edges (a[i], b[i]), using an array-backed union-find.
+
+    Each round hooks the larger root of every edge onto the smaller one and
+    then compresses paths by pointer jumping, all as vectorized array
+    operations. Returns the root (smallest node) of each node's component.
+    """
+    parent = np.arange(n)
+    while True:
+        root_a = parent[a]
+        root_b = parent[b]
+        unjoined = (root_a != root_b)
+        if not unjoined.any():
+            return parent
+        np.minimum.at(parent,
+                      np.maximum(root_a, root_b)[unjoined],
+                      np.minimum(root_a, root_b)[unjoined])
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
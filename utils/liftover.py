@@ -0,0 +1,119 @@
+# ------------------------------------------------
+# built-ins
+import gzip
+import functools
+
+# pipped
+import numpy as np
+import pandas as pd
+# ------------------------------------------------
+
+def normalise_chrom(chrom):
+    """
+    Return a chromosome name without the UCSC `chr` prefix (eg. `chr6` -> `6`).
+    """
+    chrom = str(chrom)
+    return chrom[3:] if chrom.startswith('chr') else chrom
+
+
+def normalise_chroms(chroms):
+    """
+    Return an array of chromosome names without the UCSC `chr` prefix,
+    normalising each distinct name once.
+    """
+    codes, uniques = pd.factorize(np.asarray(chroms).astype(str))
+    return np.array([normalise_chrom(c) for c in uniques], dtype=object)[codes]
+
+
+class ChainIndex(object):
+    """
+    Ungapped alignment blocks of a UCSC liftover chain file, as arrays sorted
+    by start per source chromosome. Coordinates are lifted by binary search.
+
+    Assumes the blocks of a source chromosome do not overlap, which holds
+    for the netted `*.over.chain` files distributed by UCSC.
+    """
+
+    def __init__(self, blocks):
+        self.blocks = {}
+        for (chrom, rows) in blocks.items():
+            t_start, t_end, q_chrom, q_start, q_reverse, q_size = zip(*rows)
+            order = np.argsort(t_start)
+            self.blocks[chrom] = dict(
+                t_start=np.array(t_start, dtype=np.int64)[order],
+                t_end=np.array(t_end, dtype=np.int64)[order],
+                q_chrom=np.array(q_chrom, dtype=object)[order],
+                q_start=np.array(q_start, dtype=np.int64)[order],
+                q_reverse=np.array(q_reverse, dtype=bool)[order],
+                q_size=np.array(q_size, dtype=np.int64)[order]
+            )
+
+    @classmethod
+    def from_file(cls, filename):
+        """
+        Parse a (optionally gzipped) UCSC chain file.
+        """
+        opener = gzip.open if filename.endswith('.gz') else open
+        blocks = {}
+        with opener(filename, 'rt') as f:
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                if fields[0] == 'chain':
+                    t_chrom = normalise_chrom(fields[2])
+                    t = int(fields[5])
+                    q_chrom = normalise_chrom(fields[7])
+                    q_size = int(fields[8])
+                    q_reverse = (fields[9] == '-')
+                    q = int(fields[10])
+                    rows = blocks.setdefault(t_chrom, [])
+                    continue
+                size = int(fields[0])
+                rows.append((t, t + size, q_chrom, q, q_reverse, q_size))
+                if len(fields) == 3:
+                    t += size + int(fields[1])
+                    q += size + int(fields[2])
+        return cls(blocks)
+
+    def lift(self, chroms, positions):
+        """
+        Lift 1-based positions on chroms to the target assembly. Each unique
+        position is lifted once. Returns arrays of lifted chromosomes and
+        positions, with `None` and -1 for unmapped positions.
+        """
+        chroms = normalise_chroms(chroms)
+        positions = np.asarray(positions, dtype=np.int64)
+        lifted_chroms = np.full(len(positions), None, dtype=object)
+        lifted_positions = np.full(len(positions), -1, dtype=np.int64)
+
+        for chrom in set(chroms):
+            if chrom not in self.blocks:
+                continue
+            b = self.blocks[chrom]
+            in_chrom = (chroms == chrom)
+            unique_positions, inverse = np.unique(positions[in_chrom], return_inverse=True)
+
+            zero_based = unique_positions - 1
+            i = np.searchsorted(b['t_start'], zero_based, side='right') - 1
+            mapped = (i >= 0)
+            i = np.maximum(i, 0)
+            mapped &= (zero_based < b['t_end'][i])
+
+            q = b['q_start'][i] + (zero_based - b['t_start'][i])
+            q = np.where(b['q_reverse'][i], b['q_size'][i] - q - 1, q)
+            unique_chroms = np.where(mapped, b['q_chrom'][i], None)
+            unique_lifted = np.where(mapped, q + 1, -1)
+
+            lifted_chroms[in_chrom] = unique_chroms[inverse]
+            lifted_positions[in_chrom] = unique_lifted[inverse]
+
+        return lifted_chroms, lifted_positions
+
+
+@functools.lru_cache(maxsize=None)
+def load_chain_index(filename):
+    """
+    Load a chain file once per process, as it is shared by several tests.
+    """
+    return ChainIndex.from_file(filename)
@@ -0,0 +1,101 @@
+# ------------------------------------------------
+# built-ins
+import os
+import glob
+
+# pipped
+import numpy as np
+import pandas as pd
+
+# local
+from utils.base import POSTGAP_DTYPES
+# ------------------------------------------------
+
+RELEASE_PATTERN = 'postgap.*.txt.gz'
+FILE_FIELD = 'file'
+MERGE_BATCH_FILES = 256
+
+
+def release_files(directory, pattern=RELEASE_PATTERN):
+    """
+    Return the sorted paths of the POSTGAP files of a release directory.
+    """
+    return sorted(f for f in glob.glob(os.path.join(directory, pattern)) if os.path.isfile(f))
+
+
+def as_strings(series):
+    """
+    Return series with non-null values as strings, writing integral
+    numbers without a decimal point (eg. 10.0 -> '10'), as in the TSV.
+    """
+    notnull = series.notnull()
+    values = series[notnull]
+    if pd.api.types.is_numeric_dtype(values) and np.all(np.mod(values, 1) == 0):
+        values = values.astype(np.int64)
+    strings = pd.Series(np.nan, index=series.index, dtype=object)
+    strings[notnull] = values.astype(str).astype(object)
+    return strings
+
+
+def normalise_dtypes(rows):
+    """
+    Return rows with the columns of `utils.base.POSTGAP_DTYPES` and any other
+    non-numeric column as strings, so that a fingerprint's types no longer
+    depend on the rows of its file (eg. `GRCh38_chrom` with and without
+    patch contigs).
+    """
+    for field in rows.columns.drop(FILE_FIELD, errors='ignore'):
+        if field in POSTGAP_DTYPES or not pd.api.types.is_numeric_dtype(rows[field]):
+            rows[field] = as_strings(rows[field])
+    return rows
+
+
+def fingerprint(pg, column_sets, filename):
+    """
+    Reduce a file to its fingerprint: for each set of columns, the distinct
+    rows of those columns, with the name of the file in a `file` column.
+    Returns a dict of `pandas.DataFrame` by column set.
+    """
+    fingerprints = {}
+    for columns in column_sets:
+        rows = normalise_dtypes(pg[list(columns)].drop_duplicates().reset_index(drop=True))
+        rows[FILE_FIELD] = os.path.basename(filename)
+        fingerprints[columns] = rows
+    return fingerprints
+
+
+def merge_fingerprints(parts, columns):
+    """
+    Merge the fingerprints of columns of several files, keeping the first
+    file of each distinct row. A column numeric in some files but strings
+    in others becomes strings in all of them, so that equal values compare
+    equal.
+    """
+    parts = list(parts)
+    for field in columns:
+        if not all(pd.api.types.is_numeric_dtype(part[field]) for part in parts):
+            for part in parts:
+                if pd.api.types.is_numeric_dtype(part[field]):
+                    part[field] = as_strings(part[field])
+    rows = pd.concat(parts, ignore_index=True)
+    return rows.drop_duplicates(list(columns)).reset_index(drop=True)
+
+
+def fingerprint_release(filenames, column_sets, load, batch=MERGE_BATCH_FILES):
+    """
+    Fingerprint each file (read with `load(filename, columns)`), holding a
+    single file in memory at a time, and merge the fingerprints every batch
+    files and at the end, rather than once per file, which would copy the
+    fingerprint of the release so far for each file.
+    """
+    if not filenames:
+        return None
+    columns = sorted(set(c for column_set in column_sets for c in column_set))
+    parts = {column_set: [] for column_set in column_sets}
+    for i, filename in enumerate(filenames, 1):
+        f = fingerprint(load(filename, columns), column_sets, filename)
+        for column_set in column_sets:
+            parts[column_set].append(f[column_set])
+            if i % batch == 0:
+                parts[column_set] = [merge_fingerprints(parts[column_set], column_set)]
+    return {column_set: merge_fingerprints(p, column_set) for (column_set, p) in parts.items()}
@@ -0,0 +1,49 @@
+# ------------------------------------------------
+# pipped
+import numpy as np
+import pandas as pd
+# ------------------------------------------------
+
+def lexsort_fields(df, fields):
+    """
+    Sort the rows of a `pandas.DataFrame` by fields (first field slowest)
+    with a single `numpy.lexsort`. Returns the sorting positions and the
+    sorted key array for each field.
+
+    Non-numeric fields are sorted by their factorized codes, so equal values
+    end up adjacent but not in lexical order.
+    """
+    keys = []
+    for field in fields:
+        series = df[field]
+        if pd.api.types.is_numeric_dtype(series):
+            keys.append(series.values)
+        else:
+            keys.append(pd.factorize(series)[0])
+    order = np.lexsort(keys[::-1])
+    return order, [k[order] for k in keys]
+
+
+def run_starts(sorted_keys):
+    """
+    Mark the first element of each run of equal keys across a list of
+    already sorted key arrays.
+    """
+    n = len(sorted_keys[0])
+    starts = np.zeros(n, dtype=bool)
+    starts[:1] = True
+    for k in sorted_keys:
+        starts[1:] |= (k[1:] != k[:-1])
+    return starts
+
+
+def segment_dense_ranks(value_starts, group_starts):
+    """
+    Return the dense rank (from 1) of each element of a sorted array within
+    its group, given the run starts of the values and of the groups (as
+    returned by `run_starts`). Ties share a rank.
+    """
+    counts = np.cumsum(value_starts)
+    group_idx = np.flatnonzero(group_starts)
+    group_sizes = np.diff(np.append(group_idx, len(group_starts)))
+    return counts - np.repeat(counts[group_idx] - 1, group_sizes)
@@ -0,0 +1,62 @@
+# ------------------------------------------------
+# pipped
+import numpy as np
+import pandas as pd
+
+# local
+from utils.liftover import normalise_chroms
+# ------------------------------------------------
+
+class TssIndex(object):
+    """
+    Gene TSS positions as sorted arrays per chromosome, to find the distance
+    from SNPs to their nearest TSS by binary search.
+    """
+
+    def __init__(self, chroms, positions):
+        chroms = normalise_chroms(chroms)
+        positions = np.asarray(positions, dtype=np.int64)
+        self.tss = {chrom: np.unique(positions[chroms == chrom])
+                    for chrom in set(chroms)}
+
+    @classmethod
+    def from_frame(cls, df, chrom_field='gene_chrom', tss_field='gene_tss'):
+        """
+        Build the index from the unique gene TSSs of a POSTGAP `pandas.DataFrame`.
+        """
+        genes = df[[chrom_field, tss_field]].dropna().drop_duplicates()
+        return cls(genes[chrom_field].values, genes[tss_field].values)
+
+    @classmethod
+    def from_file(cls, filename):
+        """
+        Build the index from a (optionally gzipped) gene annotation TSV file
+        with columns `gene_id`, `chrom` and `tss` (GRCh37).
+        """
+        genes = pd.read_csv(filename, sep='\t', usecols=['chrom', 'tss']).dropna().drop_duplicates()
+        return cls(genes.chrom.values, genes.tss.values)
+
+    def nearest_distances(self, chroms, positions):
+        """
+        Return the distance from each position to the nearest TSS on its
+        chromosome, or -1 if there is no TSS on that chromosome. Each unique
+        position is searched once.
+        """
+        chroms = normalise_chroms(chroms)
+        positions = np.asarray(positions, dtype=np.int64)
+        distances = np.full(len(positions), -1, dtype=np.int64)
+
+        for chrom in set(chroms):
+            tss = self.tss.get(chrom)
+            if tss is None or len(tss) == 0:
+                continue
+            in_chrom = (chroms == chrom)
+            unique_positions, inverse = np.unique(positions[in_chrom], return_inverse=True)
+            right = np.searchsorted(tss, unique_positions)
+            left = np.maximum(right - 1, 0)
+            right = np.minimum(right, len(tss) - 1)
+            unique_distances = np.minimum(np.abs(unique_positions - tss[left]),
+                                          np.abs(tss[right] - unique_positions))
+            distances[in_chrom] = unique_distances[inverse]
+
+        return distances
@@ -0,0 +1,42 @@
+# ------------------------------------------------
+# pipped
+import numpy as np
+import pandas as pd
+# ------------------------------------------------
+
+def write_violations(filename, violations):
+    """
+    Write a `pandas.DataFrame` of violations to a compressed `.npz` file,
+    storing each column as its own array (non-numeric columns as strings,
+    with a mask of their nulls) and the column names in a `columns` array.
+    Arrays are not named after columns, as `numpy.savez_compressed`
+    reserves names such as `file`.
+    """
+    arrays = []
+    null_masks = {}
+    for (i, field) in enumerate(violations.columns):
+        series = violations[field]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            arrays.append(np.asarray(series))
+        else:
+            arrays.append(np.asarray(series.astype(str), dtype=str))
+            null_masks['nulls_{}'.format(i)] = np.asarray(series.isnull())
+    columns = np.array([str(field) for field in violations.columns], dtype=str)
+    np.savez_compressed(filename, *arrays, columns=columns, **null_masks)
+
+
+def read_violations(filename):
+    """
+    Read a violations file written by `write_violations` as a `pandas.DataFrame`,
+    with nulls of non-numeric columns restored as `NaN`.
+    """
+    with np.load(filename) as arrays:
+        columns = [str(field) for field in arrays['columns']]
+        fields = {}
+        for (i, field) in enumerate(columns):
+            values = arrays['arr_{}'.format(i)]
+            nulls = 'nulls_{}'.format(i)
+            if nulls in arrays.files:
+                values = pd.Series(values, dtype=object).mask(arrays[nulls], np.nan).values
+            fields[field] = values
+        return pd.DataFrame(fields, columns=columns)